@@ -4,9 +4,28 @@ Simple RAG and Function Calling Demo
 Educational project showing how RAG and function calling work with LLMs.
 """
 
+import importlib
+
 __version__ = "1.0.0"
 
-from .function_agent import simple_function_call
-from .rag_agent import simple_rag_query
+# PEP 562 lazy imports: submodules load on first attribute access, so
+# importing the package stays cheap for paths that never touch RAG
+_LAZY = {
+    "simple_function_call": ".function_agent",
+    "simple_function_call_batch": ".function_agent",
+    "simple_function_call_stream": ".function_agent",
+    "simple_rag_query": ".rag_agent",
+    "simple_rag_query_batch": ".rag_agent",
+}
+
+__all__ = list(_LAZY)
+
 
-__all__ = ["simple_function_call", "simple_rag_query"]
+def __getattr__(name):
+    if name in _LAZY:
+        module = importlib.import_module(_LAZY[name], __name__)
+        value = getattr(module, name)
+        # Cache on the package so the next lookup skips this hook
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
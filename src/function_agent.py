@@ -3,9 +3,95 @@
 Simple function calling demo - shows how LLM can call external tools
 """
 
+import ast
+import asyncio
+import functools
+import re
 from datetime import datetime
 import ollama
 
+from . import llm_cache
+
+# One async client per event loop. Each asyncio.run creates a fresh
+# loop, and pooled connections from a closed loop raise "Event loop is
+# closed" if reused, so clients cannot be shared across loops.
+_async_clients: dict = {}
+
+
+def _get_async_client():
+    """Get the AsyncClient bound to the running event loop"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        # Drop clients whose loops have closed - their pooled
+        # connections are unusable anyway
+        for stale in [cached for cached in _async_clients if cached.is_closed()]:
+            del _async_clients[stale]
+        client = ollama.AsyncClient()
+        _async_clients[loop] = client
+    return client
+
+
+# Precompiled once: a single C-level regex scan replaces a Python-level
+# per-character loop on every call
+_BAD_CHARS_RE = re.compile(r"[^0-9+\-*/().\s]")
+
+# Find mathematical expressions
+_MATH_EXPR_RE = re.compile(r"[0-9+\-*/\s()]+")
+
+# Routing patterns - one case-insensitive C-level scan each instead of
+# lowercasing the query twice and looping a keyword list in Python
+_TIME_RE = re.compile(r"\btime\b", re.I)
+_MATH_HINT_RE = re.compile(r"(?:calculate|math|[*+\-/=])", re.I)
+
+# AST nodes a math expression may contain - anything else is rejected
+_ALLOWED_NODES = (
+    ast.Expression,
+    ast.BinOp,
+    ast.UnaryOp,
+    ast.Constant,
+    ast.Add,
+    ast.Sub,
+    ast.Mult,
+    ast.Div,
+    ast.FloorDiv,
+    ast.Pow,
+    ast.USub,
+    ast.UAdd,
+)
+
+# Largest exponent we will evaluate - stops 9**9**9 from eating the CPU
+_MAX_EXPONENT = 128
+
+# Prompt templates built once instead of per call
+_TIME_PROMPT = (
+    "The user asked: '{query}'. The current time is: {time}. "
+    "Please provide a natural response."
+)
+_CALC_PROMPT = (
+    "The user asked: '{query}'. The calculation '{expression}' equals: {result}."
+)
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile_expression(expression: str):
+    """Parse, validate and compile a math expression once per unique input"""
+    tree = ast.parse(expression, mode="eval")
+
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(f"unsupported syntax: {type(node).__name__}")
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+            raise ValueError("only numbers are allowed")
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Pow):
+            if not (
+                isinstance(node.right, ast.Constant)
+                and abs(node.right.value) <= _MAX_EXPONENT
+            ):
+                raise ValueError("exponent too large")
+
+    return compile(tree, "<calc>", "eval")
+
 
 def get_current_time() -> str:
     """Get the current date and time"""
@@ -16,66 +102,105 @@ def calculator(expression: str) -> str:
     """Calculate mathematical expressions safely"""
     try:
         # Simple whitelist for security
-        allowed_chars = set("0123456789+-*/().\\s")
-        if not all(c in allowed_chars for c in expression):
+        if _BAD_CHARS_RE.search(expression):
             return "Error: Invalid characters"
 
-        result = eval(expression)
+        # Evaluate a validated, cached code object instead of raw eval()
+        result = eval(_compile_expression(expression), {"__builtins__": {}})
         return str(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
-def simple_function_call(query: str, model: str = "llama3.2:3b") -> str:
-    """
-    Simple function calling demo - no complex framework needed
-    Shows the core concept: LLM decides when to call functions
-    """
+def _build_prompt(query: str) -> str:
+    """Route a query to the right tool and build the prompt for the LLM"""
 
     # Check if query needs time
-    if "time" in query.lower():
+    if _TIME_RE.search(query):
         time_result = get_current_time()
 
         # Ask LLM to format the response nicely
-        prompt = f"The user asked: '{query}'. The current time is: {time_result}. Please provide a natural response."
-        response = ollama.chat(
-            model=model, messages=[{"role": "user", "content": prompt}]
-        )
-        return response["message"]["content"]
+        return _TIME_PROMPT.format(query=query, time=time_result)
 
     # Check if query needs calculation
-    elif any(
-        word in query.lower() for word in ["calculate", "math", "*", "+", "-", "/", "="]
-    ):
+    if _MATH_HINT_RE.search(query):
         # Extract calculation (simple approach)
-        import re
-
-        # Find mathematical expressions
-        math_pattern = r"[0-9+\-*/\s()]+"
-        match = re.search(math_pattern, query)
+        match = _MATH_EXPR_RE.search(query)
 
         if match:
             expression = match.group().strip()
             calc_result = calculator(expression)
 
             # Ask LLM to format the response
-            prompt = f"The user asked: '{query}'. The calculation '{expression}' equals: {calc_result}."
-            " Please provide a natural response."
-            response = ollama.chat(
-                model=model, messages=[{"role": "user", "content": prompt}]
+            return _CALC_PROMPT.format(
+                query=query, expression=expression, result=calc_result
             )
-            return response["message"]["content"]
 
     # Default: regular chat
-    response = ollama.chat(model=model, messages=[{"role": "user", "content": query}])
+    return query
+
+
+def simple_function_call(query: str, model: str = "llama3.2:3b") -> str:
+    """
+    Simple function calling demo - no complex framework needed
+    Shows the core concept: LLM decides when to call functions
+    """
+    prompt = _build_prompt(query)
+    response = llm_cache.cached_chat(
+        model=model, messages=[{"role": "user", "content": prompt}]
+    )
+    return response["message"]["content"]
+
+
+def simple_function_call_stream(query: str, model: str = "llama3.2:3b"):
+    """
+    Streaming variant - yields response chunks as Ollama generates them,
+    so the caller can print the first token without waiting for the rest
+    """
+    prompt = _build_prompt(query)
+    yield from llm_cache.cached_chat_stream(
+        model=model, messages=[{"role": "user", "content": prompt}]
+    )
+
+
+async def _achat(prompt: str, model: str) -> str:
+    """Send one prompt through this loop's AsyncClient"""
+    client = _get_async_client()
+    messages = [{"role": "user", "content": prompt}]
+
+    cached = llm_cache.lookup(model, messages)
+    if cached is not None:
+        return cached
+
+    response = await client.chat(
+        model=model,
+        messages=messages,
+        options=llm_cache._CHAT_OPTIONS,
+        keep_alive=llm_cache._KEEP_ALIVE,
+    )
+    llm_cache.store(model, messages, response["message"]["content"])
     return response["message"]["content"]
 
 
+def simple_function_call_batch(queries: list, model: str = "llama3.2:3b") -> list:
+    """
+    Batched function calling - fires all prompts concurrently with
+    asyncio.gather so the Ollama server can fill its parallel slots
+    (see OLLAMA_NUM_PARALLEL in the README)
+    """
+    prompts = [_build_prompt(query) for query in queries]
+
+    async def _gather():
+        return await asyncio.gather(*(_achat(prompt, model) for prompt in prompts))
+
+    return asyncio.run(_gather())
+
+
 if __name__ == "__main__":
-    # Simple test
+    # Simple test - run as a module so the relative imports resolve:
+    #   python -m src.function_agent
     test_queries = ["What time is it?", "Calculate 15 * 7 + 23", "Hello, how are you?"]
 
-    for query in test_queries:
+    for query, response in zip(test_queries, simple_function_call_batch(test_queries)):
         print(f"\nUser: {query}")
-        response = simple_function_call(query)
         print(f"Bot: {response}")
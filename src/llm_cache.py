@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Tiny persistent LLM cache - repeated prompts skip Ollama entirely
+
+The demos and tests ask the same questions every run, so an exact-match
+cache (a SQLite lookup, microseconds) replaces a multi-second LLM call.
+"""
+
+import hashlib
+import json
+import sqlite3
+
+import ollama
+
+_CACHE_PATH = ".llm_cache.db"
+_conn = None
+
+# One persistent client for all sync chat calls - keeps a single HTTP
+# connection alive instead of handshaking per request
+_client = None
+
+# Retain the whole prompt prefix in the server's KV cache and keep the
+# model loaded between calls, so shared prefixes skip prefill
+_CHAT_OPTIONS = {"num_keep": -1}
+_KEEP_ALIVE = "5m"
+
+
+def _get_client() -> ollama.Client:
+    """Create the shared Ollama client on first use"""
+    global _client
+    if _client is None:
+        _client = ollama.Client()
+    return _client
+
+
+def _get_conn() -> sqlite3.Connection:
+    """Open the cache database once and reuse the connection"""
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(_CACHE_PATH)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, response TEXT)"
+        )
+        _conn.commit()
+    return _conn
+
+
+def _cache_key(model: str, messages: list, temperature: float) -> str:
+    """Stable hash of everything that influences the LLM response"""
+    payload = json.dumps(
+        {"model": model, "messages": messages, "temperature": temperature},
+        sort_keys=True,
+    )
+    return hashlib.blake2b(payload.encode()).hexdigest()
+
+
+def lookup(model: str, messages: list, temperature: float = 0):
+    """Return the cached response text, or None on a cache miss"""
+    key = _cache_key(model, messages, temperature)
+    row = _get_conn().execute(
+        "SELECT response FROM cache WHERE key = ?", (key,)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def store(model: str, messages: list, content: str, temperature: float = 0):
+    """Remember a response for the next identical prompt"""
+    key = _cache_key(model, messages, temperature)
+    conn = _get_conn()
+    conn.execute(
+        "INSERT OR REPLACE INTO cache (key, response) VALUES (?, ?)", (key, content)
+    )
+    conn.commit()
+
+
+def cached_chat(model: str, messages: list, temperature: float = 0):
+    """Drop-in replacement for ollama.chat with exact-match caching"""
+    cached = lookup(model, messages, temperature)
+    if cached is not None:
+        return {"message": {"content": cached}}
+
+    response = _get_client().chat(
+        model=model, messages=messages, options=_CHAT_OPTIONS, keep_alive=_KEEP_ALIVE
+    )
+    store(model, messages, response["message"]["content"], temperature)
+    return response
+
+
+def cached_chat_stream(model: str, messages: list, temperature: float = 0):
+    """Streaming variant of cached_chat - yields chunks as they arrive
+
+    Time-to-first-token drops from full-generation latency to roughly
+    one token latency; the joined response is cached like the sync path.
+    """
+    cached = lookup(model, messages, temperature)
+    if cached is not None:
+        yield cached
+        return
+
+    parts = []
+    for chunk in _get_client().chat(
+        model=model,
+        messages=messages,
+        options=_CHAT_OPTIONS,
+        keep_alive=_KEEP_ALIVE,
+        stream=True,
+    ):
+        text = chunk["message"]["content"]
+        parts.append(text)
+        yield text
+
+    store(model, messages, "".join(parts), temperature)
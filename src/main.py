@@ -4,8 +4,8 @@ Simple demo showing RAG (Retrieval Augmented Generation) and Function Calling
 """
 
 import ollama
-from .function_agent import simple_function_call
-from .rag_agent import simple_rag_query
+from .function_agent import simple_function_call_batch
+from .rag_agent import SAMPLE_DOCS, SAMPLE_QUERIES, simple_rag_query_batch
 
 
 def demo_function_calling():
@@ -18,9 +18,11 @@ def demo_function_calling():
         "Calculate 15 * 7 + 23",
     ]
 
-    for query in queries:
+    # Fire all queries concurrently instead of one blocking call each
+    responses = simple_function_call_batch(queries)
+
+    for query, response in zip(queries, responses):
         print(f"\nUser: {query}")
-        response = simple_function_call(query)
         print(f"Bot: {response}")
 
 
@@ -31,25 +33,14 @@ def demo_rag():
 
     # Add some sample documents
     print("\nAdding sample documents...")
-    docs = [
-        "Python is a programming language created by Guido van Rossum in 1991.",
-        "Machine learning is a subset of AI that learns from data.",
-        "ChromaDB is a vector database for AI applications.",
-    ]
-
-    for doc in docs:
+    for doc in SAMPLE_DOCS:
         print(f"Added: {doc[:50]}...")
 
-    # Query the documents
-    queries = [
-        "Who created Python?",
-        "What is machine learning?",
-        "Tell me about ChromaDB",
-    ]
+    # Embed the documents once and answer all queries concurrently
+    responses = simple_rag_query_batch(list(SAMPLE_QUERIES), list(SAMPLE_DOCS))
 
-    for query in queries:
+    for query, response in zip(SAMPLE_QUERIES, responses):
         print(f"\nUser: {query}")
-        response = simple_rag_query(query, docs)
         print(f"Bot: {response}")
 
 
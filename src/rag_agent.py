@@ -3,95 +3,757 @@
 Simple RAG demo - shows how to retrieve relevant documents and use them for generation
 """
 
-from sentence_transformers import SentenceTransformer
-import ollama
+import asyncio
+import functools
+import hashlib
+import sqlite3
+
 import numpy as np
 
+from . import llm_cache
+from .function_agent import _achat
+
+# Sample corpus shared by the demo runner and this module's own demo -
+# one literal, embedded once thanks to the content-hash caches
+SAMPLE_DOCS = (
+    "Python is a programming language created by Guido van Rossum in 1991.",
+    "Machine learning is a subset of AI that learns from data.",
+    "ChromaDB is a vector database for AI applications.",
+)
+
+SAMPLE_QUERIES = (
+    "Who created Python?",
+    "What is machine learning?",
+    "Tell me about ChromaDB",
+)
+
+_EMB_CACHE_PATH = ".emb_cache.sqlite"
+
+# In-memory embedding cache backed by SQLite, keyed by content hash
+_emb_cache: dict = {}
+_emb_conn = None
+
+
+def _get_emb_conn() -> sqlite3.Connection:
+    """Open the embedding cache database once and reuse the connection"""
+    global _emb_conn
+    if _emb_conn is None:
+        _emb_conn = sqlite3.connect(_EMB_CACHE_PATH)
+        _emb_conn.execute("PRAGMA journal_mode=WAL")
+        _emb_conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (sha256 TEXT PRIMARY KEY, vec BLOB)"
+        )
+        _emb_conn.commit()
+    return _emb_conn
+
+
+def _encode(text: str, model) -> np.ndarray:
+    """Encode one text, skipping the model forward pass for repeats"""
+    key = hashlib.sha256(text.encode()).hexdigest()
+
+    vec = _emb_cache.get(key)
+    if vec is not None:
+        return vec
+
+    conn = _get_emb_conn()
+    row = conn.execute("SELECT vec FROM embeddings WHERE sha256 = ?", (key,)).fetchone()
+    if row:
+        vec = np.frombuffer(row[0], dtype=np.float32)
+    else:
+        vec = model.encode([text], normalize_embeddings=True)[0].astype(np.float32)
+        conn.execute(
+            "INSERT OR REPLACE INTO embeddings (sha256, vec) VALUES (?, ?)",
+            (key, vec.tobytes()),
+        )
+        conn.commit()
+
+    # Renormalize defensively so entries cached before normalization was
+    # introduced stay usable
+    norm = np.linalg.norm(vec)
+    if norm:
+        vec = vec / norm
+
+    _emb_cache[key] = vec
+    return vec
+
+
+def _encode_queries(queries: list, model) -> np.ndarray:
+    """Encode many queries in one forward pass, reusing the query cache"""
+    if not queries:
+        # np.stack rejects an empty list; keep the column count so the
+        # downstream gemm still works
+        dim = model.get_sentence_embedding_dimension()
+        return np.empty((0, dim), dtype=np.float32)
+
+    conn = _get_emb_conn()
+    missing = []
+    for query in dict.fromkeys(queries):
+        key = hashlib.sha256(query.encode()).hexdigest()
+        if key in _emb_cache:
+            continue
+        if conn.execute(
+            "SELECT 1 FROM embeddings WHERE sha256 = ?", (key,)
+        ).fetchone():
+            continue
+        missing.append((key, query))
+
+    if missing:
+        vecs = _encode_batch(model, [query for _, query in missing])
+        for (key, _), vec in zip(missing, vecs):
+            vec = np.ascontiguousarray(vec, dtype=np.float32)
+            _emb_cache[key] = vec
+            conn.execute(
+                "INSERT OR REPLACE INTO embeddings (sha256, vec) VALUES (?, ?)",
+                (key, vec.tobytes()),
+            )
+        conn.commit()
+
+    # Every query is a cache hit now
+    return np.stack([_encode(query, model) for query in queries])
+
+
+_SEM_CACHE_PATH = ".semantic_cache.npz"
+
+# Cosine-similarity threshold for treating two queries as the same
+# question. Around 0.92 the matches get fragile, so we err on the
+# high side by default.
+_SEM_CACHE_THRESHOLD = 0.95
+
+# Parallel lists: one int8-quantized query embedding per cached answer.
+# int8 moves 4x fewer bytes through memory on each cache scan than
+# float32 at negligible similarity error. Each entry carries the scope
+# (corpus fingerprint + model name) it was answered under - a similar
+# query asked over different documents must not reuse the answer.
+_qvecs_q = None
+_qscales = None
+_qtexts: list = []
+_qanswers: list = []
+_qscopes: list = []
+_sem_cache_loaded = False
+
+
+def _quantize_int8(vec: np.ndarray):
+    """Quantize a float32 vector to int8 plus a dequantization scale"""
+    scale = float(np.abs(vec).max()) or 1.0
+    return np.round(vec / scale * 127).astype(np.int8), scale
+
+
+def _load_semantic_cache():
+    """Load previously cached question/answer pairs from disk"""
+    global _qvecs_q, _qscales, _qtexts, _qanswers, _qscopes, _sem_cache_loaded
+    if _sem_cache_loaded:
+        return
+    _sem_cache_loaded = True
+
+    try:
+        data = np.load(_SEM_CACHE_PATH)
+        _qvecs_q = data["vecs_q"]
+        _qscales = data["scales"]
+        _qtexts = data["texts"].tolist()
+        _qanswers = data["answers"].tolist()
+        _qscopes = data["scopes"].tolist()
+    except Exception:
+        # A missing, truncated or otherwise unreadable cache file must
+        # never be fatal - start over with an empty cache (and drop any
+        # arrays a partial load left behind, keeping the lists parallel)
+        _qvecs_q = None
+        _qscales = None
+        _qtexts = []
+        _qanswers = []
+        _qscopes = []
+
+
+def _semantic_cache_get(query_vec: np.ndarray, threshold: float, scope: str):
+    """Return a cached answer for a near-identical query in scope, or None"""
+    _load_semantic_cache()
+    if _qvecs_q is None:
+        return None
+
+    # Entries answered over other documents or models are not hits,
+    # however similar the question
+    in_scope = np.fromiter(
+        (entry == scope for entry in _qscopes), dtype=bool, count=len(_qscopes)
+    )
+    if not in_scope.any():
+        return None
+
+    # Integer dot product over the quantized matrix, rescaled to cosine.
+    # Accumulate in int32 - int16 overflows at 384 dimensions.
+    qv_q, q_scale = _quantize_int8(query_vec)
+    sims = (_qvecs_q.astype(np.int32) @ qv_q.astype(np.int32)) * (
+        _qscales * q_scale / (127.0 * 127.0)
+    )
+    sims = np.where(in_scope, sims, -np.inf)
+    best = int(np.argmax(sims))
+    if sims[best] >= threshold:
+        return _qanswers[best]
+    return None
+
+
+def _semantic_cache_put(query_vec: np.ndarray, query: str, answer: str, scope: str):
+    """Remember a fresh answer keyed on the query embedding and scope"""
+    global _qvecs_q, _qscales
+    qv_q, q_scale = _quantize_int8(query_vec)
+    if _qvecs_q is None:
+        _qvecs_q = qv_q[None, :]
+        _qscales = np.array([q_scale], dtype=np.float32)
+    else:
+        _qvecs_q = np.vstack([_qvecs_q, qv_q])
+        _qscales = np.append(_qscales, np.float32(q_scale))
+    _qtexts.append(query)
+    _qanswers.append(answer)
+    _qscopes.append(scope)
+    np.savez(
+        _SEM_CACHE_PATH,
+        vecs_q=_qvecs_q,
+        scales=_qscales,
+        texts=np.array(_qtexts),
+        answers=np.array(_qanswers),
+        scopes=np.array(_qscopes),
+    )
+
+
+def _model_dtype():
+    """Pick the cheapest weight dtype the hardware handles well"""
+    import torch
+
+    # Tensor cores make fp16 roughly twice as fast as fp32 on GPU
+    if torch.cuda.is_available():
+        return "float16"
+
+    # bf16 halves weight bandwidth on hardware with native support
+    try:
+        if torch.backends.mps.is_available():
+            return "bfloat16"
+        if torch.cpu._is_avx512_bf16_supported():
+            return "bfloat16"
+    except AttributeError:
+        pass
+
+    return None
+
+
+# Chunks are capped at _CHUNK_SIZE characters (~100 tokens), so the
+# encoder never needs its full sequence length - padding FLOPs scale
+# with this cap
+_MAX_SEQ_LENGTH = 128
+
+
+def _get_model(model_name: str = "all-MiniLM-L6-v2"):
+    """Load each embedding model once per process and reuse it"""
+    # The default is filled in here, outside the cached loader -
+    # lru_cache keys on the arguments as passed, so _get_model() and
+    # _get_model("all-MiniLM-L6-v2") must not become two entries
+    return _load_model_cached(model_name)
+
+
+@functools.lru_cache(maxsize=4)
+def _load_model_cached(model_name: str):
+    """Construct an embedding model (one cache entry per name)"""
+    # Imported lazily - sentence_transformers drags in torch, and the
+    # function-calling paths should not pay that multi-second import
+    from sentence_transformers import SentenceTransformer
+
+    dtype = _model_dtype()
+    if dtype is None:
+        # Plain CPU: ONNX Runtime's fused graph beats eager PyTorch for
+        # a model this small. Optional - needs the
+        # sentence-transformers[onnx] extra, so fall back quietly.
+        try:
+            model = SentenceTransformer(model_name, backend="onnx")
+            model.max_seq_length = _MAX_SEQ_LENGTH
+            return model
+        except Exception:
+            pass
+
+    model_kwargs = {"torch_dtype": dtype} if dtype else {}
+    model = SentenceTransformer(model_name, model_kwargs=model_kwargs)
+    model.max_seq_length = _MAX_SEQ_LENGTH
+    return model
+
+
+def _encode_batch(model, texts: list) -> np.ndarray:
+    """Encode a list of texts in one batched forward pass"""
+    return model.encode(
+        texts,
+        batch_size=64,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+        show_progress_bar=False,
+    )
+
 
 def create_embeddings(texts: list, model_name: str = "all-MiniLM-L6-v2"):
-    """Create embeddings for a list of texts"""
-    model = SentenceTransformer(model_name)
-    embeddings = model.encode(texts)
-    return embeddings, model
+    """Create embeddings for a list of texts in one batched forward pass"""
+    return _encode_batch(_get_model(model_name), texts)
+
+
+# Document embeddings keyed by content hash - repeated corpora only pay
+# for documents not seen before. Persisted to disk so a restarted
+# process cold-starts at O(load) instead of O(encode); the content-hash
+# keys make invalidation automatic when a document changes.
+_DOC_EMB_CACHE: dict = {}
+_DOC_EMB_CACHE_PATH = ".doc_emb_cache.npz"
+_doc_cache_loaded = False
+
+
+def _load_doc_cache():
+    """Prepopulate the document cache from the last run, if present"""
+    global _doc_cache_loaded
+    if _doc_cache_loaded:
+        return
+    _doc_cache_loaded = True
+
+    try:
+        with np.load(_DOC_EMB_CACHE_PATH) as data:
+            for key in data.files:
+                _DOC_EMB_CACHE[key] = np.ascontiguousarray(
+                    data[key], dtype=np.float32
+                )
+    except OSError:
+        pass
+
+
+def _save_doc_cache():
+    """Write the document cache back to disk"""
+    np.savez_compressed(_DOC_EMB_CACHE_PATH, **_DOC_EMB_CACHE)
+
+
+# Above this many uncached documents, fan encoding out over a
+# multi-process pool; below it the process-spawn overhead dominates
+_MULTI_PROCESS_THRESHOLD = 512
+
+
+def _encode_batch_multi_process(model, texts: list) -> np.ndarray:
+    """Encode a big batch across sentence-transformers' worker pool"""
+    pool = model.start_multi_process_pool()
+    try:
+        return model.encode_multi_process(
+            texts, pool, batch_size=64, normalize_embeddings=True
+        )
+    finally:
+        model.stop_multi_process_pool(pool)
+
+
+def _embed_documents(docs: list, model) -> np.ndarray:
+    """Embed documents, batch-encoding only the ones missing from the cache"""
+    _load_doc_cache()
+    keys = [hashlib.sha256(doc.encode()).hexdigest() for doc in docs]
+    missing = [
+        (i, doc) for i, (key, doc) in enumerate(zip(keys, docs))
+        if key not in _DOC_EMB_CACHE
+    ]
+
+    if missing:
+        texts = [doc for _, doc in missing]
+        if len(texts) > _MULTI_PROCESS_THRESHOLD:
+            new_vecs = _encode_batch_multi_process(model, texts)
+        else:
+            new_vecs = _encode_batch(model, texts)
+        for (i, _), vec in zip(missing, new_vecs):
+            # Contiguous float32 at store time keeps the stacked matrix
+            # a straight BLAS sgemv input with no conversion per query
+            _DOC_EMB_CACHE[keys[i]] = np.ascontiguousarray(vec, dtype=np.float32)
+        _save_doc_cache()
+
+    return np.stack([_DOC_EMB_CACHE[key] for key in keys])
+
+
+# Stacked corpus matrices cached by content, so retrieval over an
+# unchanged corpus reuses one long-lived array (and its FAISS index)
+_CORPUS_CACHE: dict = {}
+
+
+def _corpus_key(chunks: list) -> str:
+    """Content fingerprint of a chunked corpus"""
+    return hashlib.sha256("\x00".join(chunks).encode()).hexdigest()
+
+
+def _corpus_matrix(chunks: list, model) -> np.ndarray:
+    """Return the stacked embedding matrix for a corpus, cached by content"""
+    key = _corpus_key(chunks)
+    matrix = _CORPUS_CACHE.get(key)
+    if matrix is None:
+        matrix = _embed_documents(chunks, model)
+        _CORPUS_CACHE[key] = matrix
+    return matrix
+
+
+# Dispatch to the Numba kernel only above this corpus size - below it
+# the JIT and call overhead outweigh the parallel loop
+_NUMBA_THRESHOLD = 1024
 
 
-def find_most_relevant(query: str, documents: list, embeddings, model, top_k: int = 2):
+@functools.lru_cache(maxsize=1)
+def _get_dot_kernel():
+    """Compile the parallel similarity kernel once; None without numba"""
+    try:
+        from numba import njit, prange
+    except ImportError:
+        return None
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _dot_kernel(emb, q):
+        n, d = emb.shape
+        sims = np.empty(n, dtype=np.float32)
+        for i in prange(n):
+            s = np.float32(0.0)
+            for j in range(d):
+                s += emb[i, j] * q[j]
+            sims[i] = s
+        return sims
+
+    return _dot_kernel
+
+
+# int8 views of corpus matrices, keyed by matrix identity like the
+# FAISS index cache. A quantized row is 384 bytes instead of 1536, so
+# very large scans move a quarter of the memory.
+_QUANT_CACHE: dict = {}
+
+# Below this corpus size the fp32 gemv is comfortably cache-resident
+# and quantization buys nothing
+_INT8_THRESHOLD = 4096
+
+
+def _quantized_matrix(embeddings):
+    """Return (int8 matrix, scale) for a corpus matrix, cached by identity"""
+    cached = _QUANT_CACHE.get(id(embeddings))
+    if cached is not None:
+        return cached[1], cached[2]
+
+    scale = 127.0 / (float(np.abs(embeddings).max()) or 1.0)
+    emb_i8 = np.round(embeddings * scale).astype(np.int8)
+    _QUANT_CACHE[id(embeddings)] = (embeddings, emb_i8, scale)
+    return emb_i8, scale
+
+
+def _int8_similarities(embeddings, query_embedding):
+    """Similarity scan over the int8-quantized corpus matrix"""
+    emb_i8, emb_scale = _quantized_matrix(embeddings)
+    q_scale = 127.0 / (float(np.abs(query_embedding).max()) or 1.0)
+    q_i8 = np.round(query_embedding * q_scale).astype(np.int8)
+
+    # Accumulate in int32 (int16 overflows at 384 dims), then rescale
+    sims = emb_i8.astype(np.int32) @ q_i8.astype(np.int32)
+    return sims.astype(np.float32) / (emb_scale * q_scale)
+
+
+# FAISS indexes keyed by matrix identity. The matrix is stored alongside
+# its index so the id stays valid for the cache's lifetime.
+_INDEX_CACHE: dict = {}
+
+
+def _build_index(embeddings):
+    """Build (or reuse) a FAISS inner-product index; None without faiss"""
+    try:
+        import faiss
+    except ImportError:
+        return None
+
+    cached = _INDEX_CACHE.get(id(embeddings))
+    if cached is not None:
+        return cached[1]
+
+    index = faiss.IndexFlatIP(embeddings.shape[1])
+    index.add(np.ascontiguousarray(embeddings, dtype=np.float32))
+    _INDEX_CACHE[id(embeddings)] = (embeddings, index)
+    return index
+
+
+def find_most_relevant(
+    query: str, documents: list, embeddings, model, top_k: int = 2,
+    query_embedding=None,
+):
     """Find most relevant documents using cosine similarity"""
-    # Get query embedding
-    query_embedding = model.encode([query])
+    if query_embedding is None:
+        # Get query embedding (cached across repeated queries; unit length)
+        query_embedding = _encode(query, model)
+
+    k = min(top_k, len(documents))
 
-    # Calculate cosine similarity
-    similarities = np.dot(query_embedding, embeddings.T).flatten()
+    index = _build_index(embeddings)
+    if index is not None:
+        # FAISS inner-product search over normalized vectors = cosine
+        sims, indices = index.search(
+            query_embedding.reshape(1, -1).astype(np.float32), k
+        )
+        top_sims, top_indices = sims[0], indices[0]
+    else:
+        # Cosine similarity: both sides are normalized, so one contiguous
+        # matrix-vector product does it - no transpose, no flatten. Big
+        # corpora use the quantized scan or the parallel Numba kernel.
+        kernel = (
+            _get_dot_kernel() if len(documents) > _NUMBA_THRESHOLD else None
+        )
+        if len(documents) > _INT8_THRESHOLD:
+            similarities = _int8_similarities(embeddings, query_embedding)
+        elif kernel is not None:
+            similarities = kernel(embeddings, query_embedding)
+        else:
+            similarities = embeddings @ query_embedding
+
+        # Top-k via argpartition: O(N) selection, then sort just k items
+        partition = np.argpartition(-similarities, k - 1)[:k]
+        top_indices = partition[np.argsort(-similarities[partition])]
+        top_sims = similarities[top_indices]
+
+    # .tolist() converts indices and scores to Python scalars in one
+    # bulk pass instead of boxing them element by element in the loop
+    return [
+        {"content": documents[idx], "similarity": sim}
+        for idx, sim in zip(top_indices.tolist(), top_sims.tolist())
+    ]
 
-    # Get top-k most similar documents
-    top_indices = np.argsort(similarities)[-top_k:][::-1]
 
-    relevant_docs = []
-    for idx in top_indices:
-        relevant_docs.append(
-            {"content": documents[idx], "similarity": similarities[idx]}
+def find_most_relevant_batch(
+    queries: list, documents: list, embeddings, model, top_k: int = 2
+) -> list:
+    """Find relevant documents for many queries in one batched search
+
+    Returns one list of {content, similarity} dicts per query. All
+    queries are encoded in a single forward pass and searched with one
+    batched FAISS lookup or one gemm instead of N independent scans.
+    """
+    query_embs = _encode_queries(list(queries), model)
+    k = min(top_k, len(documents))
+
+    index = _build_index(embeddings)
+    if index is not None:
+        sims, indices = index.search(
+            np.ascontiguousarray(query_embs, dtype=np.float32), k
         )
+    else:
+        # One gemm for every query, then a row-wise top-k
+        all_sims = query_embs @ embeddings.T
+        rows = np.arange(len(queries))[:, None]
+        partition = np.argpartition(-all_sims, k - 1, axis=1)[:, :k]
+        order = np.argsort(-all_sims[rows, partition], axis=1)
+        indices = partition[rows, order]
+        sims = all_sims[rows, indices]
+
+    return [
+        [
+            {"content": documents[idx], "similarity": sim}
+            for idx, sim in zip(idx_row, sim_row)
+        ]
+        for idx_row, sim_row in zip(indices.tolist(), sims.tolist())
+    ]
+
+
+# Chunking bounds in characters. MiniLM truncates input past its max
+# sequence length, so long documents are split into overlapping chunks
+# instead of silently losing their tails.
+_CHUNK_SIZE = 400
+_CHUNK_OVERLAP = 50
+
+
+def _chunk_text(
+    text: str, size: int = _CHUNK_SIZE, overlap: int = _CHUNK_OVERLAP
+) -> list:
+    """Split text into overlapping chunks, preferring paragraph boundaries"""
+    if len(text) <= size:
+        return [text]
+
+    chunks = []
+    for paragraph in text.split("\n\n"):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= size:
+            chunks.append(paragraph)
+            continue
+
+        # Sliding window with overlap for oversized paragraphs
+        start = 0
+        while start < len(paragraph):
+            end = min(start + size, len(paragraph))
+            # Extend to the next word boundary so words stay intact
+            while end < len(paragraph) and not paragraph[end].isspace():
+                end += 1
+            chunks.append(paragraph[start:end].strip())
+            if end >= len(paragraph):
+                break
+            start = max(end - overlap, start + 1)
+
+    return chunks
+
+
+# Prompt template built once instead of per call
+_RAG_PROMPT = """Based on the following context, please answer the question.
+
+Context:
+{context}
+
+Question: {query}
+
+Answer:"""
+
+
+def _build_rag_prompt(query: str, relevant_docs: list) -> str:
+    """Build the LLM prompt from the query and its retrieved documents
+
+    The context sits at the front of the prompt and the documents are
+    joined in a stable sorted order, so queries retrieving the same set
+    produce an identical prefix and Ollama's KV cache only has to
+    prefill the question tokens.
+    """
+    context = "\n\n".join(sorted(doc["content"] for doc in relevant_docs))
+    return _RAG_PROMPT.format(context=context, query=query)
 
-    return relevant_docs
 
+# Exact-match answer cache keyed by (query, retrieved context, model).
+# Sits in front of the SQLite LLM cache: a hit skips prompt formatting
+# and the database round-trip. Size-capped to bound memory.
+_RESP_CACHE: dict = {}
+_RESP_CACHE_MAX = 1024
 
-def simple_rag_query(query: str, documents: list, model_name: str = "llama3.2:3b"):
+
+def _resp_cache_key(query: str, relevant_docs: list, model_name: str) -> str:
+    """Hash the query, its retrieved context and the model name"""
+    context = "\n".join(doc["content"] for doc in relevant_docs)
+    return hashlib.sha256(
+        "\x00".join((query, context, model_name)).encode()
+    ).hexdigest()
+
+
+def _resp_cache_put(key: str, answer: str):
+    """Store an answer, evicting the oldest entry once full"""
+    if len(_RESP_CACHE) >= _RESP_CACHE_MAX:
+        _RESP_CACHE.pop(next(iter(_RESP_CACHE)))
+    _RESP_CACHE[key] = answer
+
+
+def _stream_rag_answer(
+    prompt: str, query_vec, query: str, model_name: str, resp_key: str, scope: str
+):
+    """Yield answer chunks as they arrive, then cache the joined answer"""
+    parts = []
+    for chunk in llm_cache.cached_chat_stream(
+        model=model_name, messages=[{"role": "user", "content": prompt}]
+    ):
+        parts.append(chunk)
+        yield chunk
+    answer = "".join(parts)
+    _resp_cache_put(resp_key, answer)
+    _semantic_cache_put(query_vec, query, answer, scope)
+
+
+def simple_rag_query(
+    query: str,
+    documents: list,
+    model_name: str = "llama3.2:3b",
+    semantic_threshold: float = _SEM_CACHE_THRESHOLD,
+    stream: bool = False,
+):
     """
     Simple RAG demo - core concept in minimal code
     1. Convert documents to embeddings (vectors)
     2. Find most similar documents to the query
     3. Use those documents as context for the LLM
+
+    Near-duplicates of previously answered questions are served from a
+    semantic cache without re-running retrieval or generation.
+
+    With stream=True an iterator of response chunks is returned instead
+    of the full string, so the first token shows up after roughly one
+    token of latency rather than the whole generation.
     """
 
     if not documents:
         # No documents, just use regular chat
-        response = ollama.chat(
-            model=model_name, messages=[{"role": "user", "content": query}]
-        )
+        messages = [{"role": "user", "content": query}]
+        if stream:
+            return llm_cache.cached_chat_stream(model=model_name, messages=messages)
+        response = llm_cache.cached_chat(model=model_name, messages=messages)
         return response["message"]["content"]
 
-    # Step 1: Create embeddings for all documents
-    embeddings, embedding_model = create_embeddings(documents)
-
-    # Step 2: Find most relevant documents
-    relevant_docs = find_most_relevant(query, documents, embeddings, embedding_model)
+    # Step 1: Split long documents and embed the chunks; the corpus
+    # matrix is cached by content so repeat queries reuse it (and its
+    # FAISS index) as one long-lived array
+    chunks = [chunk for doc in documents for chunk in _chunk_text(doc)]
+    embedding_model = _get_model()
+    embeddings = _corpus_matrix(chunks, embedding_model)
+    query_vec = _encode(query, embedding_model)
 
-    # Step 3: Create context from relevant documents
-    context = "\n\n".join([doc["content"] for doc in relevant_docs])
+    # Semantic cache: paraphrases of an already-answered question skip
+    # retrieval and the LLM entirely (embeddings are unit vectors). The
+    # scope pins hits to this corpus and LLM - the same question over
+    # other documents gets its own entry.
+    scope = f"{_corpus_key(chunks)}\x00{model_name}"
+    cached_answer = _semantic_cache_get(query_vec, semantic_threshold, scope)
+    if cached_answer is not None:
+        return iter([cached_answer]) if stream else cached_answer
 
-    # Step 4: Ask LLM with context
-    prompt = f"""Based on the following context, please answer the question.
+    # Step 2: Find most relevant chunks
+    relevant_docs = find_most_relevant(
+        query, chunks, embeddings, embedding_model, query_embedding=query_vec
+    )
 
-Context:
-{context}
+    # Exact-match cache: same query over the same retrieved context is
+    # answered straight from memory
+    resp_key = _resp_cache_key(query, relevant_docs, model_name)
+    cached_answer = _RESP_CACHE.get(resp_key)
+    if cached_answer is not None:
+        return iter([cached_answer]) if stream else cached_answer
 
-Question: {query}
+    # Step 3+4: Ask LLM with the relevant documents as context
+    prompt = _build_rag_prompt(query, relevant_docs)
 
-Answer:"""
+    if stream:
+        return _stream_rag_answer(
+            prompt, query_vec, query, model_name, resp_key, scope
+        )
 
-    response = ollama.chat(
+    response = llm_cache.cached_chat(
         model=model_name, messages=[{"role": "user", "content": prompt}]
     )
 
-    return response["message"]["content"]
+    answer = response["message"]["content"]
+    _resp_cache_put(resp_key, answer)
+    _semantic_cache_put(query_vec, query, answer, scope)
+    return answer
 
 
-if __name__ == "__main__":
-    # Simple test
-    test_docs = [
-        "Python is a programming language created by Guido van Rossum in 1991.",
-        "Machine learning is a subset of AI that learns from data.",
-        "ChromaDB is a vector database for AI applications.",
-    ]
+def simple_rag_query_batch(
+    queries: list, documents: list, model_name: str = "llama3.2:3b"
+) -> list:
+    """
+    Batched RAG - embeds the documents once, then fires all prompts
+    concurrently with asyncio.gather so the Ollama server can answer
+    them in parallel
+    """
 
-    test_queries = [
-        "Who created Python?",
-        "What is machine learning?",
-        "Tell me about ChromaDB",
-    ]
+    if not documents:
+        prompts = list(queries)
+    else:
+        # Chunk the documents once, then retrieve for every query with
+        # one batched encode + one batched search
+        chunks = [chunk for doc in documents for chunk in _chunk_text(doc)]
+        embedding_model = _get_model()
+        embeddings = _corpus_matrix(chunks, embedding_model)
+        all_relevant = find_most_relevant_batch(
+            queries, chunks, embeddings, embedding_model
+        )
 
+        prompts = [
+            _build_rag_prompt(query, relevant_docs)
+            for query, relevant_docs in zip(queries, all_relevant)
+        ]
+
+    async def _gather():
+        return await asyncio.gather(*(_achat(prompt, model_name) for prompt in prompts))
+
+    return asyncio.run(_gather())
+
+
+if __name__ == "__main__":
+    # Simple test - run as a module so the relative imports resolve:
+    #   python -m src.rag_agent
     print("=== RAG Demo ===")
-    for query in test_queries:
+    for query in SAMPLE_QUERIES:
         print(f"\nUser: {query}")
-        response = simple_rag_query(query, test_docs)
-        print(f"Bot: {response}")
+        print("Bot: ", end="", flush=True)
+        for chunk in simple_rag_query(query, list(SAMPLE_DOCS), stream=True):
+            print(chunk, end="", flush=True)
+        print()
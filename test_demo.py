@@ -3,11 +3,6 @@
 Simple test to verify the demo works
 """
 
-import sys
-import os
-
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
-
 
 def test_function_calling():
     """Test function calling demo"""
@@ -26,22 +21,50 @@ def test_rag():
     """Test RAG demo"""
     print("\n=== Testing RAG ===")
 
-    # Test the core RAG logic without Ollama
-    from src.rag_agent import create_embeddings, find_most_relevant
+    # Test the core RAG logic without Ollama: the query and documents
+    # share one encode call - one tokenization, one forward pass
+    import numpy as np
+
+    from src.rag_agent import _get_model
 
     docs = [
         "Python is a programming language.",
         "Machine learning uses data to learn.",
         "The sky is blue.",
     ]
-
-    embeddings, model = create_embeddings(docs)
     query = "What is Python?"
-    relevant = find_most_relevant(query, docs, embeddings, model)
+
+    model = _get_model()
+    embeddings = model.encode([query] + docs, normalize_embeddings=True)
+    query_emb, doc_embs = embeddings[0], embeddings[1:]
+    similarities = doc_embs @ query_emb
+    best = int(np.argmax(similarities))
 
     print(f"✓ Created embeddings for {len(docs)} documents")
-    print(f"✓ Found most relevant doc: '{relevant[0]['content'][:30]}...'")
-    print(f"✓ Similarity score: {relevant[0]['similarity']:.3f}")
+    print(f"✓ Found most relevant doc: '{docs[best][:30]}...'")
+    print(f"✓ Similarity score: {float(similarities[best]):.3f}")
+
+
+def test_rag_batch():
+    """Test batched RAG retrieval"""
+    print("\n=== Testing Batched RAG ===")
+
+    from src.rag_agent import _get_model, create_embeddings, find_most_relevant_batch
+
+    docs = [
+        "Python is a programming language.",
+        "Machine learning uses data to learn.",
+        "The sky is blue.",
+    ]
+    queries = ["What is Python?", "How do machines learn?"]
+
+    embeddings = create_embeddings(docs)
+    model = _get_model()
+    all_results = find_most_relevant_batch(queries, docs, embeddings, model)
+
+    print(f"✓ Retrieved for {len(queries)} queries in one batched search")
+    for query, relevant in zip(queries, all_results):
+        print(f"✓ '{query}' -> '{relevant[0]['content'][:30]}...'")
 
 
 if __name__ == "__main__":
@@ -50,6 +73,7 @@ if __name__ == "__main__":
 
     test_function_calling()
     test_rag()
+    test_rag_batch()
 
     print("\n✓ All basic tests passed!")
     print("To run full demo: python chatbot.py")